@@ -0,0 +1,117 @@
+import asyncio
+import json
+import threading
+import time
+from collections import defaultdict
+
+# Events buffered per connection before it is treated as a slow consumer
+STREAM_QUEUE_SIZE = 64
+# Seconds of silence before a keep-alive comment is sent
+STREAM_HEARTBEAT_SECONDS = 15
+
+RESYNC_EVENT = {"type": "resync"}
+
+
+class Subscription:
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+        self.dropped = False
+
+    def offer(self, event: dict):
+        # Runs on the subscriber's event loop
+        if self.dropped:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Too far behind: discard the backlog and tell the client to refetch
+            self.drop()
+
+    def drop(self):
+        # Runs on the subscriber's event loop; the stream ends after the resync event
+        if self.dropped:
+            return
+        self.dropped = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(RESYNC_EVENT)
+
+
+class EventHub:
+    """In-process pub/sub fanning change events out to a user's open streams.
+
+    publish() is safe to call from the sync endpoints' worker threads; delivery
+    is handed to each subscriber's event loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: dict[int, set[Subscription]] = defaultdict(set)
+
+    def subscribe(self, user_id: int) -> Subscription:
+        sub = Subscription(asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers[user_id].add(sub)
+        return sub
+
+    def unsubscribe(self, user_id: int, sub: Subscription):
+        with self._lock:
+            subs = self._subscribers.get(user_id)
+            if subs is None:
+                return
+            subs.discard(sub)
+            if not subs:
+                del self._subscribers[user_id]
+
+    def publish(self, user_id: int, entity: str, op: str, data: dict):
+        with self._lock:
+            subs = list(self._subscribers.get(user_id, ()))
+        if not subs:
+            return
+        event = {"type": "change", "entity": entity, "op": op, "data": data}
+        for sub in subs:
+            try:
+                sub.loop.call_soon_threadsafe(sub.offer, event)
+            except RuntimeError:
+                # Loop already closed; the stream's cleanup will unsubscribe it
+                pass
+
+    def disconnect_user(self, user_id: int):
+        """End every open stream of a user, e.g. after logout or account deletion.
+
+        Clients get a resync event and must reconnect, which re-checks their token.
+        """
+        with self._lock:
+            subs = list(self._subscribers.get(user_id, ()))
+        for sub in subs:
+            try:
+                sub.loop.call_soon_threadsafe(sub.drop)
+            except RuntimeError:
+                pass
+
+    async def stream(self, user_id: int, expires_at: float):
+        """Yield SSE frames for one connection until it is dropped, closed, or its token expires."""
+        sub = self.subscribe(user_id)
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                remaining = expires_at - time.time()
+                if remaining <= 0:
+                    yield f"event: resync\ndata: {json.dumps(RESYNC_EVENT)}\n\n"
+                    return
+                try:
+                    event = await asyncio.wait_for(
+                        sub.queue.get(), timeout=min(STREAM_HEARTBEAT_SECONDS, remaining)
+                    )
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+                if event is RESYNC_EVENT:
+                    return
+        finally:
+            self.unsubscribe(user_id, sub)
+
+
+hub = EventHub()
@@ -0,0 +1,212 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import IdempotencyRecord
+
+IDEMPOTENCY_TTL = timedelta(hours=24)
+# Responses kept in memory in front of the table
+IDEMPOTENCY_CACHE_SIZE = 1024
+# How long a duplicate waits for the original request before giving up. Each waiter
+# holds a sync worker thread, so keep this short and let the client retry instead.
+IDEMPOTENCY_WAIT_SECONDS = 3
+IDEMPOTENCY_RETRY_AFTER_SECONDS = 1
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+# Expired rows removed per write; more than the one row each write adds, so the table still shrinks
+IDEMPOTENCY_SWEEP_BATCH = 100
+
+
+def request_fingerprint(method: str, path: str, body: dict) -> str:
+    # `body` should hold only the fields the client sent; server-filled defaults
+    # (e.g. today's date) would make a later retry look like a different request.
+    raw = json.dumps([method, path, body], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class IdempotencyStore:
+    """Replays stored responses for retried POSTs carrying an Idempotency-Key.
+
+    Lookups hit an in-memory LRU first, then the idempotency_records table.
+    A duplicate that arrives while the original is still running waits for it
+    instead of executing the handler a second time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cache: OrderedDict = OrderedDict()
+        self._in_flight: dict[tuple[int, str], threading.Event] = {}
+
+    def _cache_get(self, cache_key, now: datetime):
+        with self._lock:
+            entry = self._cache.get(cache_key)
+            if entry is None:
+                return None
+            if entry["expires_at"] <= now:
+                del self._cache[cache_key]
+                return None
+            self._cache.move_to_end(cache_key)
+            return entry
+
+    def _cache_put(self, cache_key, entry: dict):
+        with self._lock:
+            self._cache[cache_key] = entry
+            self._cache.move_to_end(cache_key)
+            while len(self._cache) > IDEMPOTENCY_CACHE_SIZE:
+                self._cache.popitem(last=False)
+
+    def forget_user(self, user_id: int):
+        """Drop a deleted account's cached responses."""
+        with self._lock:
+            for cache_key in [k for k in self._cache if k[0] == user_id]:
+                del self._cache[cache_key]
+
+    def _lookup(self, db: Session, cache_key, now: datetime):
+        entry = self._cache_get(cache_key, now)
+        if entry is not None:
+            return entry
+        user_id, key = cache_key
+        record = (
+            db.query(IdempotencyRecord)
+            .filter(
+                IdempotencyRecord.user_id == user_id,
+                IdempotencyRecord.key == key,
+                IdempotencyRecord.expires_at > now,
+            )
+            .first()
+        )
+        if record is None:
+            return None
+        entry = {
+            "fingerprint": record.fingerprint,
+            "status_code": record.status_code,
+            "body": json.loads(record.response_body),
+            "expires_at": record.expires_at,
+        }
+        self._cache_put(cache_key, entry)
+        return entry
+
+    def _add_record(self, db: Session, cache_key, entry: dict):
+        user_id, key = cache_key
+        now = datetime.utcnow()
+        # Expired rows are swept a bounded batch at a time so the table stays bounded by the TTL
+        # without a large delete holding the writer lock
+        expired = (
+            db.query(IdempotencyRecord.id)
+            .filter(IdempotencyRecord.expires_at <= now)
+            .limit(IDEMPOTENCY_SWEEP_BATCH)
+            .subquery()
+        )
+        db.query(IdempotencyRecord).filter(
+            IdempotencyRecord.id.in_(db.query(expired.c.id))
+        ).delete(synchronize_session=False)
+        db.add(IdempotencyRecord(
+            user_id=user_id,
+            key=key,
+            fingerprint=entry["fingerprint"],
+            status_code=entry["status_code"],
+            response_body=json.dumps(entry["body"]),
+            created_at=now,
+            expires_at=entry["expires_at"],
+        ))
+
+    @staticmethod
+    def _replay(entry: dict, fingerprint: str) -> JSONResponse:
+        if entry["fingerprint"] != fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+        return JSONResponse(
+            content=entry["body"],
+            status_code=entry["status_code"],
+            headers={"Idempotent-Replayed": "true"},
+        )
+
+    def run(
+        self,
+        db: Session,
+        user_id: int,
+        key: str | None,
+        fingerprint: str,
+        handler,
+        to_body,
+        on_commit=None,
+        status_code: int = 201,
+    ):
+        """Run `handler` once per (user, key) and commit its writes.
+
+        `handler` stages its rows on `db` without committing and returns the
+        created instance. The stored response is committed in the same
+        transaction, so a crash can never leave the row without its record.
+        `to_body` serializes the instance; `on_commit` runs after the commit.
+        """
+        if key is None:
+            instance = handler()
+            db.commit()
+            db.refresh(instance)
+            if on_commit:
+                on_commit(instance)
+            return to_body(instance)
+        if not key or len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            raise HTTPException(status_code=400, detail="Invalid Idempotency-Key")
+
+        cache_key = (user_id, key)
+        while True:
+            entry = self._lookup(db, cache_key, datetime.utcnow())
+            if entry is not None:
+                return self._replay(entry, fingerprint)
+
+            with self._lock:
+                pending = self._in_flight.get(cache_key)
+                if pending is None:
+                    self._in_flight[cache_key] = threading.Event()
+                    break
+            if not pending.wait(IDEMPOTENCY_WAIT_SECONDS):
+                raise HTTPException(
+                    status_code=409,
+                    detail="A request with this Idempotency-Key is still in progress",
+                    headers={"Retry-After": str(IDEMPOTENCY_RETRY_AFTER_SECONDS)},
+                )
+
+        try:
+            # The original may have finished between our lookup and claiming the slot
+            entry = self._lookup(db, cache_key, datetime.utcnow())
+            if entry is not None:
+                return self._replay(entry, fingerprint)
+
+            instance = handler()
+            db.flush()
+            db.refresh(instance)
+            body = to_body(instance)
+            entry = {
+                "fingerprint": fingerprint,
+                "status_code": status_code,
+                "body": body,
+                "expires_at": datetime.utcnow() + IDEMPOTENCY_TTL,
+            }
+            self._add_record(db, cache_key, entry)
+            try:
+                db.commit()
+            except IntegrityError:
+                # Another worker process committed this key first; our insert is rolled back with it
+                db.rollback()
+                entry = self._lookup(db, cache_key, datetime.utcnow())
+                if entry is None:
+                    raise
+                return self._replay(entry, fingerprint)
+
+            self._cache_put(cache_key, entry)
+            if on_commit:
+                on_commit(instance)
+            return JSONResponse(content=body, status_code=status_code)
+        finally:
+            # Errors are not stored, so waiters re-check and a later retry runs again
+            with self._lock:
+                self._in_flight.pop(cache_key).set()
+
+
+idempotency = IdempotencyStore()
@@ -1,7 +1,20 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, status, BackgroundTasks
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 import models, schemas, database
-from models import Expense, User, RevokedToken, FinancialGoal, Badge
+from models import (
+    Expense,
+    User,
+    RevokedToken,
+    FinancialGoal,
+    Badge,
+    AccountDeletion,
+    IdempotencyRecord,
+    Budget,
+    BudgetCounter,
+    BudgetAlert,
+)
 from schemas import (
     ExpenseCreate,
     ExpenseUpdate,
@@ -14,11 +27,27 @@ from schemas import (
     FinancialGoalUpdate,
     BadgeCreate,
     BadgeOut,
+    DashboardSnapshotOut,
+    AccountDeletionOut,
+    BudgetCreate,
+    BudgetOut,
+    BudgetStatusOut,
+    BudgetAlertOut,
 )
 import bcrypt
+import asyncio
+import threading
+from collections import defaultdict
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from events import hub
+from idempotency import idempotency, request_fingerprint
 
 app = FastAPI()
 models.Base.metadata.create_all(bind=database.engine)
+# create_all skips tables that already exist, so add indexes introduced later explicitly
+for index in models.Expense.__table__.indexes:
+    index.create(database.engine, checkfirst=True)
 
 from datetime import datetime, timedelta, timezone
 from uuid import uuid4
@@ -28,7 +57,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
 from typing import List, Optional
-from fastapi import Path, Query
+from fastapi import Path, Query, Request
 
 SECRET_KEY = "change_this_to_a_long_random_secret_key_please"
 ALGORITHM = "HS256"
@@ -41,6 +70,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let browser clients see idempotent replays and when to retry an in-flight key
+    expose_headers=["Idempotent-Replayed", "Retry-After"],
 )
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
@@ -56,6 +87,16 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
 def is_token_revoked(db: Session, jti: str) -> bool:
     return db.query(models.RevokedToken).filter(models.RevokedToken.jti == jti).first() is not None
 
+def is_account_disabled(db: Session, user_id: int) -> bool:
+    # An account with an unfinished deletion job is disabled immediately, even while its data is
+    # still being removed. Finished jobs are ignored in case a legacy users table reused the id.
+    return (
+        db.query(AccountDeletion.id)
+        .filter(AccountDeletion.user_id == user_id, AccountDeletion.status != "done")
+        .first()
+        is not None
+    )
+
 def decode_token(token: str):
     return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
 
@@ -97,6 +138,8 @@ def login(data: dict, db: Session = Depends(get_db)):
     user = db.query(models.User).filter(models.User.username == username).first()
     if not user or not bcrypt.checkpw(password.encode(), user.hashed_password.encode()):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect username or password")
+    if is_account_disabled(db, user.id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Account is disabled")
 
     token_data = {"sub": str(user.id), "username": user.username}
     token, jti, exp = create_access_token(token_data)
@@ -115,7 +158,7 @@ def get_me(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
         raise HTTPException(status_code=401, detail="Token revoked")
 
     user = db.query(models.User).filter(models.User.id == user_id).first()
-    if not user:
+    if not user or is_account_disabled(db, user.id):
         raise HTTPException(status_code=404, detail="User not found")
 
     return {"id": user.id, "username": user.username, "email": user.email}
@@ -141,6 +184,8 @@ def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_
     user = db.query(models.User).get(int(user_id))
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
+    if is_account_disabled(db, user.id):
+        raise HTTPException(status_code=401, detail="Account is disabled")
     return user
 
 @app.post("/logout")
@@ -165,12 +210,122 @@ def logout(data: dict, db: Session = Depends(get_db)):
         db.add(db_revoked)
         db.commit()
 
+    # Open streams authenticated with this token must not keep receiving data
+    if payload.get("sub") is not None:
+        hub.disconnect_user(int(payload["sub"]))
+
     return {"message": "Logged out successfully"}
 
 @app.get("/dashboard")
 def get_dashboard(current_user: models.User = Depends(get_current_user)):
     return {"message": f"Welcome, {current_user.username}!"}
 
+"""
+Dashboard snapshot (single round-trip)
+"""
+
+DASHBOARD_RECENT_LIMIT_MAX = 100
+
+def _run_with_session(fn, *args):
+    # Sessions are not thread-safe, so each concurrent query gets its own.
+    db = database.SessionLocal()
+    try:
+        return fn(db, *args)
+    finally:
+        db.close()
+
+def _snapshot_recent_expenses(db: Session, user_id: int, limit: int):
+    rows = (
+        db.query(Expense.id, Expense.category, Expense.amount, Expense.date)
+        .filter(Expense.user_id == user_id)
+        .order_by(Expense.date.desc())
+        .limit(limit)
+        .all()
+    )
+    return [{"id": r.id, "category": r.category, "amount": r.amount, "date": r.date} for r in rows]
+
+def _snapshot_month_to_date(db: Session, user_id: int, month_start: datetime, now: datetime):
+    rows = (
+        db.query(Expense.category, func.sum(Expense.amount).label("total"))
+        .filter(Expense.user_id == user_id, Expense.date >= month_start, Expense.date <= now)
+        .group_by(Expense.category)
+        .order_by(func.sum(Expense.amount).desc())
+        .all()
+    )
+    return [{"category": r.category, "total": r.total or 0} for r in rows]
+
+def _snapshot_active_goals(db: Session, user_id: int, now: datetime):
+    # Spending inside each goal's window is aggregated in the same statement
+    spent = func.coalesce(func.sum(Expense.amount), 0).label("spent")
+    rows = (
+        db.query(
+            FinancialGoal.id,
+            FinancialGoal.target_savings,
+            FinancialGoal.start_date,
+            FinancialGoal.end_date,
+            spent,
+        )
+        .outerjoin(
+            Expense,
+            (Expense.user_id == FinancialGoal.user_id)
+            & (Expense.date >= FinancialGoal.start_date)
+            & (Expense.date <= FinancialGoal.end_date),
+        )
+        .filter(
+            FinancialGoal.user_id == user_id,
+            FinancialGoal.start_date <= now,
+            FinancialGoal.end_date >= now,
+        )
+        .group_by(FinancialGoal.id)
+        .order_by(FinancialGoal.start_date.desc())
+        .all()
+    )
+    return [
+        {
+            "id": r.id,
+            "target_savings": r.target_savings,
+            "start_date": r.start_date,
+            "end_date": r.end_date,
+            "spent": r.spent,
+            "remaining": max(0, r.target_savings - r.spent),
+        }
+        for r in rows
+    ]
+
+def _snapshot_badges(db: Session, user_id: int):
+    rows = (
+        db.query(Badge.id, Badge.badge_name, Badge.date)
+        .filter(Badge.user_id == user_id)
+        .order_by(Badge.date.desc())
+        .all()
+    )
+    return [{"id": r.id, "badge_name": r.badge_name, "date_awarded": r.date.date()} for r in rows]
+
+@app.get("/api/dashboard/snapshot", response_model=DashboardSnapshotOut)
+async def get_dashboard_snapshot(
+    limit: int = Query(default=10, ge=1, le=DASHBOARD_RECENT_LIMIT_MAX),
+    current_user: User = Depends(get_current_user),
+):
+    now = datetime.utcnow()
+    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    user_id = current_user.id
+
+    recent, month_totals, goals, badges = await asyncio.gather(
+        run_in_threadpool(_run_with_session, _snapshot_recent_expenses, user_id, limit),
+        run_in_threadpool(_run_with_session, _snapshot_month_to_date, user_id, month_start, now),
+        run_in_threadpool(_run_with_session, _snapshot_active_goals, user_id, now),
+        run_in_threadpool(_run_with_session, _snapshot_badges, user_id),
+    )
+
+    return {
+        "user": _to_out(current_user),
+        "recent_expenses": recent,
+        "month_to_date": month_totals,
+        "month_to_date_total": sum(t["total"] for t in month_totals),
+        "active_goals": goals,
+        "badges": badges,
+    }
+
 # The old login endpoint has been replaced with the OAuth2PasswordRequestForm version above.
 
 # @app.post("/login")
@@ -260,19 +415,290 @@ def update_user_api(
     db.add(user); db.commit(); db.refresh(user)
     return _to_out(user)
 
-# Delete user (self) — HARD DELETE
-@app.delete("/api/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
+# ----------- ACCOUNT DELETION (background, batched) -----------
+
+DELETION_BATCH_SIZE = 500
+
+_deletion_lock = threading.Lock()
+_deletions_in_progress: set[str] = set()
+
+def _delete_batch(db: Session, model, user_id: int) -> int:
+    ids = db.query(model.id).filter(model.user_id == user_id).limit(DELETION_BATCH_SIZE).subquery()
+    return (
+        db.query(model)
+        .filter(model.id.in_(db.query(ids.c.id)))
+        .delete(synchronize_session=False)
+    )
+
+def run_account_deletion(job_id: str):
+    """Remove a disabled account's data in bounded batches, then the user row.
+
+    Every batch commits together with its progress counters, so a crashed or
+    restarted worker simply picks up whatever rows are left.
+    """
+    with _deletion_lock:
+        if job_id in _deletions_in_progress:
+            return
+        _deletions_in_progress.add(job_id)
+
+    db = database.SessionLocal()
+    try:
+        job = db.query(AccountDeletion).filter(AccountDeletion.id == job_id).first()
+        if not job or job.status == "done":
+            return
+        job.status = "running"
+        job.updated_at = datetime.utcnow()
+        db.commit()
+
+        for model, counter in (
+            (Expense, "expenses_deleted"),
+            (FinancialGoal, "goals_deleted"),
+            (Badge, "badges_deleted"),
+            (IdempotencyRecord, None),
+            (BudgetAlert, None),
+            (BudgetCounter, None),
+            (Budget, None),
+        ):
+            while True:
+                deleted = _delete_batch(db, model, job.user_id)
+                if not deleted:
+                    break
+                if counter:
+                    setattr(job, counter, getattr(job, counter) + deleted)
+                job.updated_at = datetime.utcnow()
+                db.commit()
+
+        db.query(User).filter(User.id == job.user_id).delete(synchronize_session=False)
+        job.status = "done"
+        job.updated_at = job.completed_at = datetime.utcnow()
+        db.commit()
+        idempotency.forget_user(job.user_id)
+    finally:
+        db.close()
+        with _deletion_lock:
+            _deletions_in_progress.discard(job_id)
+
+@app.on_event("startup")
+def resume_account_deletions():
+    db = database.SessionLocal()
+    try:
+        pending = [j.id for j in db.query(AccountDeletion.id).filter(AccountDeletion.status != "done")]
+    finally:
+        db.close()
+    for job_id in pending:
+        threading.Thread(target=run_account_deletion, args=(job_id,), daemon=True).start()
+
+# Delete user (self) — disables the account now, removes its data in the background
+@app.delete("/api/users/{user_id}", response_model=AccountDeletionOut, status_code=status.HTTP_202_ACCEPTED)
 def delete_user_api(
+    background_tasks: BackgroundTasks,
     user_id: int = Path(..., ge=1),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
+    token: str = Depends(oauth2_scheme),
 ):
     _require_self(user_id, current_user)
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    db.delete(user); db.commit()
-    return
+
+    # A finished job for this id belongs to an earlier account that held the same id
+    db.query(AccountDeletion).filter(
+        AccountDeletion.user_id == user_id, AccountDeletion.status == "done"
+    ).delete(synchronize_session=False)
+
+    job = AccountDeletion(id=str(uuid4()), user_id=user_id, status="pending")
+    db.add(job)
+
+    # Revoke the calling token explicitly; any other token is refused by get_current_user
+    payload = decode_token(token)
+    jti = payload.get("jti")
+    if jti and not is_token_revoked(db, jti):
+        db.add(models.RevokedToken(jti=jti, expires_at=datetime.utcfromtimestamp(payload["exp"])))
+
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent DELETE (another token for the same account) created the job first
+        db.rollback()
+        return db.query(AccountDeletion).filter(AccountDeletion.user_id == user_id).one()
+    db.refresh(job)
+    hub.disconnect_user(user_id)
+    background_tasks.add_task(run_account_deletion, job.id)
+    return job
+
+# Deletion progress. The account's tokens no longer work, so knowing the unguessable job id
+# is the only protection; the response deliberately omits the user id.
+@app.get("/api/users/deletions/{job_id}", response_model=AccountDeletionOut)
+def get_account_deletion(job_id: str, db: Session = Depends(get_db)):
+    job = db.query(AccountDeletion).filter(AccountDeletion.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Deletion job not found")
+    return job
+
+"""
+Budget counters
+"""
+
+BUDGET_ALERT_THRESHOLDS = (80, 100)
+
+def _budget_period_bounds(period: str, when: datetime) -> tuple[datetime, datetime]:
+    day = _to_naive_utc(when).replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == "weekly":
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=7)
+    start = day.replace(day=1)
+    if start.month == 12:
+        return start, start.replace(year=start.year + 1, month=1)
+    return start, start.replace(month=start.month + 1)
+
+def _raw_category_spend(db: Session, user_id: int, category: str, start: datetime, end: datetime) -> float:
+    return (
+        db.query(func.sum(Expense.amount))
+        .filter(
+            Expense.user_id == user_id,
+            Expense.category == category,
+            Expense.date >= start,
+            Expense.date < end,
+        )
+        .scalar()
+        or 0
+    )
+
+def _record_budget_alerts(db: Session, budget: Budget, period_start: datetime, before: float, after: float):
+    for threshold in BUDGET_ALERT_THRESHOLDS:
+        mark = budget.limit_amount * threshold / 100
+        if not (before < mark <= after):
+            continue
+        exists = (
+            db.query(BudgetAlert.id)
+            .filter(
+                BudgetAlert.budget_id == budget.id,
+                BudgetAlert.period_start == period_start,
+                BudgetAlert.threshold == threshold,
+            )
+            .first()
+        )
+        if exists:
+            continue
+        try:
+            # Savepoint: a concurrent writer recording the same alert must not roll back the expense
+            with db.begin_nested():
+                db.add(BudgetAlert(
+                    user_id=budget.user_id,
+                    budget_id=budget.id,
+                    category=budget.category,
+                    period_start=period_start,
+                    threshold=threshold,
+                    spent=after,
+                    limit_amount=budget.limit_amount,
+                ))
+        except IntegrityError:
+            pass
+
+def _apply_budget_delta(db: Session, user_id: int, category: str, when: datetime, delta: float):
+    """Add `delta` to every budget counter covering (category, when).
+
+    Must run before the expense change itself is flushed: a period's counter is
+    seeded from the raw expenses on first use, and that seed has to reflect the
+    state without this change. The caller's commit makes both writes atomic.
+    """
+    if not delta:
+        return
+    budgets = db.query(Budget).filter(Budget.user_id == user_id, Budget.category == category).all()
+    for budget in budgets:
+        start, end = _budget_period_bounds(budget.period, when)
+        counter = BudgetCounter.budget_id == budget.id, BudgetCounter.period_start == start
+
+        # Increment in SQL so concurrent writers never lose an update
+        updated = (
+            db.query(BudgetCounter)
+            .filter(*counter)
+            .update({BudgetCounter.spent: BudgetCounter.spent + delta}, synchronize_session=False)
+        )
+        if not updated:
+            seed = _raw_category_spend(db, user_id, category, start, end)
+            try:
+                with db.begin_nested():
+                    db.add(BudgetCounter(user_id=user_id, budget_id=budget.id, period_start=start, spent=seed + delta))
+            except IntegrityError:
+                # Another writer created the row first
+                db.query(BudgetCounter).filter(*counter).update(
+                    {BudgetCounter.spent: BudgetCounter.spent + delta}, synchronize_session=False
+                )
+
+        if delta > 0:
+            spent = db.query(BudgetCounter.spent).filter(*counter).scalar()
+            _record_budget_alerts(db, budget, start, spent - delta, spent)
+
+def reconcile_budget_counters(db: Session, user_id: int) -> int:
+    """Rebuild all of a user's budget counters from raw expenses in one pass."""
+    budgets_by_category = defaultdict(list)
+    for budget in db.query(Budget).filter(Budget.user_id == user_id):
+        budgets_by_category[budget.category].append(budget)
+
+    totals = defaultdict(float)
+    if budgets_by_category:
+        rows = (
+            db.query(Expense.category, Expense.date, Expense.amount)
+            .filter(Expense.user_id == user_id, Expense.category.in_(list(budgets_by_category)))
+            .yield_per(1000)
+        )
+        for row in rows:
+            for budget in budgets_by_category[row.category]:
+                start, _ = _budget_period_bounds(budget.period, row.date)
+                totals[(budget.id, start)] += row.amount
+
+    db.query(BudgetCounter).filter(BudgetCounter.user_id == user_id).delete(synchronize_session=False)
+    db.add_all(
+        BudgetCounter(user_id=user_id, budget_id=budget_id, period_start=start, spent=spent)
+        for (budget_id, start), spent in totals.items()
+    )
+    db.commit()
+    return len(totals)
+
+"""
+Live updates (Server-Sent Events)
+"""
+
+def _expense_out(expense: Expense) -> dict:
+    return ExpenseOut.model_validate(expense).model_dump(mode="json")
+
+def _goal_out(goal: FinancialGoal) -> dict:
+    return FinancialGoalOut.model_validate(goal).model_dump(mode="json")
+
+def _publish_expense(op: str, expense: Expense):
+    hub.publish(expense.user_id, "expense", op, _expense_out(expense) if op == "upsert" else {"id": expense.id})
+
+def _publish_goal(op: str, goal: FinancialGoal):
+    hub.publish(goal.user_id, "goal", op, _goal_out(goal) if op == "upsert" else {"id": goal.id})
+
+def _badge_out(badge: Badge) -> dict:
+    # Badge stores a datetime in `date`; BadgeOut exposes it as `date_awarded`
+    return BadgeOut(
+        id=badge.id,
+        user_id=badge.user_id,
+        badge_name=badge.badge_name,
+        date_awarded=badge.date.date(),
+    ).model_dump(mode="json")
+
+def _publish_badge(op: str, badge: Badge):
+    hub.publish(badge.user_id, "badge", op, _badge_out(badge) if op == "upsert" else {"id": badge.id})
+
+# Header auth only: a query-string token would end up in access logs
+@app.get("/api/stream")
+async def stream_updates(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+):
+    current_user = await run_in_threadpool(get_current_user, db, token)
+    user_id = current_user.id
+    db.close()  # don't hold a connection for the life of the stream
+
+    # Revocation and account deletion close the stream via hub.disconnect_user; expiry is enforced here
+    expires_at = decode_token(token)["exp"]
+    return StreamingResponse(
+        hub.stream(user_id, expires_at),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 """
 Expenses CRUD
@@ -280,22 +706,31 @@ Expenses CRUD
 @app.post("/api/expenses", response_model=ExpenseOut, status_code=status.HTTP_201_CREATED)
 def create_expense(
     payload: ExpenseCreate,
+    request: Request,
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    if payload.amount <= 0:
-        raise HTTPException(status_code=400, detail="Amount must be positive")
-
-    new_expense = Expense(
-        user_id=current_user.id,
-        category=payload.category,
-        amount=payload.amount,
-        date=payload.date or datetime.utcnow(),
+    def handler():
+        if payload.amount <= 0:
+            raise HTTPException(status_code=400, detail="Amount must be positive")
+
+        new_expense = Expense(
+            user_id=current_user.id,
+            category=payload.category,
+            amount=payload.amount,
+            date=_to_naive_utc(payload.date) if payload.date else datetime.utcnow(),
+        )
+        _apply_budget_delta(db, current_user.id, new_expense.category, new_expense.date, new_expense.amount)
+        db.add(new_expense)
+        return new_expense
+
+    fingerprint = request_fingerprint("POST", request.url.path, payload.model_dump(mode="json", exclude_unset=True))
+    return idempotency.run(
+        db, current_user.id, idempotency_key, fingerprint, handler,
+        to_body=_expense_out,
+        on_commit=lambda expense: _publish_expense("upsert", expense),
     )
-    db.add(new_expense)
-    db.commit()
-    db.refresh(new_expense)
-    return new_expense
 
 @app.get("/api/expenses/{expense_id}", response_model=ExpenseOut)
 def get_expense(
@@ -351,13 +786,22 @@ def update_expense(
     if payload.amount is not None and payload.amount <= 0:
         raise HTTPException(status_code=400, detail="Amount must be positive")
 
+    old_category, old_date, old_amount = expense.category, expense.date, expense.amount
+    new_category = payload.category or old_category
+    new_amount = payload.amount or old_amount
+    new_date = _to_naive_utc(payload.date) if payload.date else old_date
+    if (new_category, new_date, new_amount) != (old_category, old_date, old_amount):
+        _apply_budget_delta(db, current_user.id, old_category, old_date, -old_amount)
+        _apply_budget_delta(db, current_user.id, new_category, new_date, new_amount)
+
     if payload.category: expense.category = payload.category
     if payload.amount: expense.amount = payload.amount
-    if payload.date: expense.date = payload.date
+    if payload.date: expense.date = new_date
 
     db.add(expense)
     db.commit()
     db.refresh(expense)
+    _publish_expense("upsert", expense)
     return expense
 
 
@@ -373,8 +817,10 @@ def delete_expense(
     if expense.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Forbidden")
 
+    _apply_budget_delta(db, current_user.id, expense.category, expense.date, -expense.amount)
     db.delete(expense)
     db.commit()
+    _publish_expense("delete", expense)
     return {"message": "Expense deleted successfully"}
 
 """
@@ -384,31 +830,39 @@ Financial Goals CRUD
 @app.post("/api/goals", response_model=FinancialGoalOut, status_code=status.HTTP_201_CREATED)
 def create_goal(
     payload: FinancialGoalCreateViaPeriod,
+    request: Request,
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    target_amount = payload.target_amount
-    period_days = payload.period
-    if target_amount <= 0:
-        raise HTTPException(status_code=400, detail="target_amount must be positive")
-    if period_days <= 0:
-        raise HTTPException(status_code=400, detail="period must be a positive number of days")
-
-    start_dt = _to_naive_utc(payload.start_date) if payload.start_date else datetime.utcnow()
-    end_dt = start_dt + timedelta(days=period_days)
-    if end_dt <= start_dt:
-        raise HTTPException(status_code=400, detail="end_date must be after start_date")
-
-    goal = FinancialGoal(
-        user_id=current_user.id,
-        target_savings=target_amount,
-        start_date=start_dt,
-        end_date=end_dt,
+    def handler():
+        target_amount = payload.target_amount
+        period_days = payload.period
+        if target_amount <= 0:
+            raise HTTPException(status_code=400, detail="target_amount must be positive")
+        if period_days <= 0:
+            raise HTTPException(status_code=400, detail="period must be a positive number of days")
+
+        start_dt = _to_naive_utc(payload.start_date) if payload.start_date else datetime.utcnow()
+        end_dt = start_dt + timedelta(days=period_days)
+        if end_dt <= start_dt:
+            raise HTTPException(status_code=400, detail="end_date must be after start_date")
+
+        goal = FinancialGoal(
+            user_id=current_user.id,
+            target_savings=target_amount,
+            start_date=start_dt,
+            end_date=end_dt,
+        )
+        db.add(goal)
+        return goal
+
+    fingerprint = request_fingerprint("POST", request.url.path, payload.model_dump(mode="json", exclude_unset=True))
+    return idempotency.run(
+        db, current_user.id, idempotency_key, fingerprint, handler,
+        to_body=_goal_out,
+        on_commit=lambda goal: _publish_goal("upsert", goal),
     )
-    db.add(goal)
-    db.commit()
-    db.refresh(goal)
-    return goal
 
 
 @app.get("/api/goals", response_model=List[FinancialGoalOut])
@@ -479,6 +933,7 @@ def update_goal(
     db.add(goal)
     db.commit()
     db.refresh(goal)
+    _publish_goal("upsert", goal)
     return goal
 
 
@@ -496,6 +951,7 @@ def delete_goal(
 
     db.delete(goal)
     db.commit()
+    _publish_goal("delete", goal)
     return {"message": "Goal deleted successfully"}
 
 
@@ -506,6 +962,8 @@ CREATE BADGE (Manual creation)
 @app.post("/api/badges/create", response_model=BadgeOut, status_code=status.HTTP_201_CREATED)
 def create_badge(
     payload: BadgeCreate,
+    request: Request,
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -513,15 +971,22 @@ def create_badge(
     if payload.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Cannot create badge for another user")
 
-    new_badge = Badge(
-        user_id=current_user.id,
-        badge_name=payload.badge_name,
-        date=payload.date or datetime.utcnow(),
+    def handler():
+        awarded = payload.date_awarded
+        new_badge = Badge(
+            user_id=current_user.id,
+            badge_name=payload.badge_name,
+            date=datetime.combine(awarded, datetime.min.time()) if awarded else datetime.utcnow(),
+        )
+        db.add(new_badge)
+        return new_badge
+
+    fingerprint = request_fingerprint("POST", request.url.path, payload.model_dump(mode="json", exclude_unset=True))
+    return idempotency.run(
+        db, current_user.id, idempotency_key, fingerprint, handler,
+        to_body=_badge_out,
+        on_commit=lambda badge: _publish_badge("upsert", badge),
     )
-    db.add(new_badge)
-    db.commit()
-    db.refresh(new_badge)
-    return new_badge
 
 
 """
@@ -591,9 +1056,144 @@ def award_badge_if_weekly_savings_met(
                 db.add(new_badge)
                 db.commit()
                 db.refresh(new_badge)
+                _publish_badge("upsert", new_badge)
                 earned_badges.append(new_badge)
 
     if not earned_badges:
         raise HTTPException(status_code=200, detail="No new badges earned this week")
 
-    return earned_badges
\ No newline at end of file
+    return earned_badges
+
+
+"""
+Budgets
+"""
+
+@app.post("/api/budgets", response_model=BudgetOut, status_code=status.HTTP_201_CREATED)
+def create_budget(
+    payload: BudgetCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    existing = (
+        db.query(Budget)
+        .filter(
+            Budget.user_id == current_user.id,
+            Budget.category == payload.category,
+            Budget.period == payload.period,
+        )
+        .first()
+    )
+    if existing:
+        raise HTTPException(status_code=409, detail="Budget already exists for this category and period")
+
+    budget = Budget(
+        user_id=current_user.id,
+        category=payload.category,
+        period=payload.period,
+        limit_amount=payload.limit_amount,
+    )
+    db.add(budget)
+    try:
+        db.flush()
+    except IntegrityError:
+        # A concurrent request created the same budget between the check and the insert
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Budget already exists for this category and period")
+
+    # Seed the current period so status reads include spending from before the budget existed
+    start, end = _budget_period_bounds(budget.period, datetime.utcnow())
+    seed = _raw_category_spend(db, current_user.id, budget.category, start, end)
+    db.add(BudgetCounter(user_id=current_user.id, budget_id=budget.id, period_start=start, spent=seed))
+    db.commit()
+    db.refresh(budget)
+    return budget
+
+
+@app.get("/api/budgets", response_model=List[BudgetOut])
+def list_budgets(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    return db.query(Budget).filter(Budget.user_id == current_user.id).order_by(Budget.category).all()
+
+
+@app.get("/api/budgets/status", response_model=List[BudgetStatusOut])
+def get_budget_status(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    now = datetime.utcnow()
+    budgets = db.query(Budget).filter(Budget.user_id == current_user.id).order_by(Budget.category).all()
+    bounds = {budget.id: _budget_period_bounds(budget.period, now) for budget in budgets}
+
+    # One read for every budget's current-period counter
+    counters = {}
+    if budgets:
+        rows = (
+            db.query(BudgetCounter.budget_id, BudgetCounter.period_start, BudgetCounter.spent)
+            .filter(
+                BudgetCounter.budget_id.in_(list(bounds)),
+                BudgetCounter.period_start.in_({start for start, _ in bounds.values()}),
+            )
+            .all()
+        )
+        counters = {(r.budget_id, r.period_start): r.spent for r in rows}
+
+    result = []
+    for budget in budgets:
+        start, end = bounds[budget.id]
+        spent = counters.get((budget.id, start)) or 0
+        result.append({
+            "budget_id": budget.id,
+            "category": budget.category,
+            "period": budget.period,
+            "period_start": start,
+            "period_end": end,
+            "limit_amount": budget.limit_amount,
+            "spent": spent,
+            "remaining": max(0, budget.limit_amount - spent),
+            "percent_used": round(spent / budget.limit_amount * 100, 2),
+        })
+    return result
+
+
+@app.get("/api/budgets/alerts", response_model=List[BudgetAlertOut])
+def list_budget_alerts(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    return (
+        db.query(BudgetAlert)
+        .filter(BudgetAlert.user_id == current_user.id)
+        .order_by(BudgetAlert.created_at.desc())
+        .all()
+    )
+
+
+@app.post("/api/budgets/reconcile")
+def reconcile_budgets(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    periods = reconcile_budget_counters(db, current_user.id)
+    return {"message": "Budget counters reconciled", "periods": periods}
+
+
+@app.delete("/api/budgets/{budget_id}")
+def delete_budget(
+    budget_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    budget = db.query(Budget).filter(Budget.id == budget_id).first()
+    if not budget:
+        raise HTTPException(status_code=404, detail="Budget not found")
+    if budget.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+    db.query(BudgetAlert).filter(BudgetAlert.budget_id == budget.id).delete(synchronize_session=False)
+    db.query(BudgetCounter).filter(BudgetCounter.budget_id == budget.id).delete(synchronize_session=False)
+    db.delete(budget)
+    db.commit()
+    return {"message": "Budget deleted successfully"}
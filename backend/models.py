@@ -1,18 +1,23 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Float, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime
 
 class User(Base):
     __tablename__ = "users"
+    # Never hand a deleted account's id to a new signup
+    __table_args__ = {"sqlite_autoincrement": True}
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, index=True)
     email = Column(String, unique=True, index=True)
     hashed_password = Column(String)
 
-    expenses = relationship("Expense", back_populates="user")
-    goals = relationship("FinancialGoal", back_populates="user")
-    badges = relationship("Badge", back_populates="user")
+    # Children are removed in batches by the deletion worker (or by the DB cascade),
+    # so never load them into the session just to delete the parent.
+    expenses = relationship("Expense", back_populates="user", passive_deletes=True)
+    goals = relationship("FinancialGoal", back_populates="user", passive_deletes=True)
+    badges = relationship("Badge", back_populates="user", passive_deletes=True)
+    budgets = relationship("Budget", back_populates="user", passive_deletes=True)
 
 class RevokedToken(Base):
     __tablename__ = "revoked_tokens"
@@ -22,12 +27,44 @@ class RevokedToken(Base):
     jti = Column(String, unique=True, index=True, nullable=False)
     # When the token naturally expires; useful for housekeeping
     expires_at = Column(DateTime, nullable=False, default=datetime.utcnow)
-    
+
+class IdempotencyRecord(Base):
+    """Stored response for a POST that carried an Idempotency-Key header."""
+    __tablename__ = "idempotency_records"
+    __table_args__ = (UniqueConstraint("user_id", "key", name="uq_idempotency_user_key"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    key = Column(String, nullable=False)
+    # sha256 of method, path and request body
+    fingerprint = Column(String, nullable=False)
+    status_code = Column(Integer, nullable=False)
+    response_body = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+class AccountDeletion(Base):
+    __tablename__ = "account_deletions"
+
+    # Opaque job id; doubles as the handle for polling progress after the account is gone
+    id = Column(String, primary_key=True, index=True)
+    # No FK: the row must outlive the user it describes
+    user_id = Column(Integer, unique=True, index=True, nullable=False)
+    status = Column(String, nullable=False, default="pending")  # pending | running | done
+    expenses_deleted = Column(Integer, nullable=False, default=0)
+    goals_deleted = Column(Integer, nullable=False, default=0)
+    badges_deleted = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    completed_at = Column(DateTime, nullable=True)
+
 class Expense(Base):
     __tablename__ = "expenses"
+    # Serves per-user category/date range sums (budgets, dashboard)
+    __table_args__ = (Index("ix_expenses_user_category_date", "user_id", "category", "date"),)
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     category = Column(String, nullable=False)
     amount = Column(Float, nullable=False)
     date = Column(DateTime, default=datetime.utcnow)
@@ -53,4 +90,42 @@ class Badge(Base):
     badge_name = Column(String, nullable=False)
     date = Column(DateTime, default=datetime.utcnow)
 
-    user = relationship("User", back_populates="badges")
\ No newline at end of file
+    user = relationship("User", back_populates="badges")
+
+class Budget(Base):
+    __tablename__ = "budgets"
+    __table_args__ = (UniqueConstraint("user_id", "category", "period", name="uq_budget_user_category_period"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    category = Column(String, nullable=False)
+    period = Column(String, nullable=False)  # weekly | monthly
+    limit_amount = Column(Float, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    user = relationship("User", back_populates="budgets")
+
+class BudgetCounter(Base):
+    """Running spend for one budget period, kept in step with expense writes."""
+    __tablename__ = "budget_counters"
+    __table_args__ = (UniqueConstraint("budget_id", "period_start", name="uq_budget_counter_period"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    budget_id = Column(Integer, ForeignKey("budgets.id", ondelete="CASCADE"), nullable=False, index=True)
+    period_start = Column(DateTime, nullable=False)
+    spent = Column(Float, nullable=False, default=0)
+
+class BudgetAlert(Base):
+    __tablename__ = "budget_alerts"
+    __table_args__ = (UniqueConstraint("budget_id", "period_start", "threshold", name="uq_budget_alert_threshold"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    budget_id = Column(Integer, ForeignKey("budgets.id", ondelete="CASCADE"), nullable=False, index=True)
+    category = Column(String, nullable=False)
+    period_start = Column(DateTime, nullable=False)
+    threshold = Column(Integer, nullable=False)  # percent of the limit: 80 or 100
+    spent = Column(Float, nullable=False)
+    limit_amount = Column(Float, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
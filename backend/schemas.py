@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from typing import List, Literal, Optional
 from datetime import datetime
 
 class UserCreate(BaseModel):
@@ -20,6 +20,19 @@ class UserOut(BaseModel):
     class Config:
         from_attributes = True  # (Pydantic v2)
 
+class AccountDeletionOut(BaseModel):
+    id: str
+    status: str
+    expenses_deleted: int
+    goals_deleted: int
+    badges_deleted: int
+    created_at: datetime
+    updated_at: datetime
+    completed_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
 class ExpenseBase(BaseModel):
     category: str = Field(min_length=2, max_length=50)
     amount: float = Field(gt=0, description="Must be a positive number")
@@ -86,4 +99,76 @@ class BadgeOut(BaseModel):
     date_awarded: date
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class DashboardExpenseOut(BaseModel):
+    id: int
+    category: str
+    amount: float
+    date: datetime
+
+class DashboardCategoryTotal(BaseModel):
+    category: str
+    total: float
+
+class DashboardGoalOut(BaseModel):
+    id: int
+    target_savings: float
+    start_date: datetime
+    end_date: datetime
+    spent: float
+    remaining: float
+
+class DashboardBadgeOut(BaseModel):
+    id: int
+    badge_name: str
+    date_awarded: date
+
+class DashboardSnapshotOut(BaseModel):
+    user: UserOut
+    recent_expenses: List[DashboardExpenseOut]
+    month_to_date: List[DashboardCategoryTotal]
+    month_to_date_total: float
+    active_goals: List[DashboardGoalOut]
+    badges: List[DashboardBadgeOut]
+
+
+class BudgetCreate(BaseModel):
+    category: str = Field(min_length=2, max_length=50)
+    period: Literal["weekly", "monthly"] = "monthly"
+    limit_amount: float = Field(gt=0, description="Spending limit per period (positive)")
+
+class BudgetOut(BaseModel):
+    id: int
+    user_id: int
+    category: str
+    period: str
+    limit_amount: float
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class BudgetStatusOut(BaseModel):
+    budget_id: int
+    category: str
+    period: str
+    period_start: datetime
+    period_end: datetime
+    limit_amount: float
+    spent: float
+    remaining: float
+    percent_used: float
+
+class BudgetAlertOut(BaseModel):
+    id: int
+    budget_id: int
+    category: str
+    period_start: datetime
+    threshold: int
+    spent: float
+    limit_amount: float
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
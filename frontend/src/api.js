@@ -109,3 +109,71 @@ export async function deleteExpense(token, id) {
   }
   return res.json();
 }
+
+export async function getDashboardSnapshot(token, limit = 10) {
+  const res = await fetch(`${API_URL}/api/dashboard/snapshot?limit=${limit}`, {
+    headers: { Authorization: `Bearer ${token}` },
+  });
+  if (!res.ok) throw new Error("Failed to load dashboard");
+  return res.json();
+}
+
+const STREAM_RETRY_MAX_MS = 30000;
+
+// Live change events. Reads the SSE stream with fetch because the endpoint only
+// accepts the Authorization header, which EventSource cannot send.
+// Reconnects with exponential backoff and emits { type: "resync" } whenever events
+// may have been missed; stops on 401. Returns an AbortController; call .abort() to disconnect.
+export function openUpdateStream(token, onEvent) {
+  const controller = new AbortController();
+  const { signal } = controller;
+  const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+  (async () => {
+    let attempt = 0;
+    let connected = false;
+    let resynced = false;
+    while (!signal.aborted) {
+      try {
+        const res = await fetch(`${API_URL}/api/stream`, {
+          headers: { Authorization: `Bearer ${token}` },
+          signal,
+        });
+        if (res.status === 401) return;
+        if (!res.ok) throw new Error("Failed to open update stream");
+
+        // Anything published while we were disconnected is lost
+        if (connected && !resynced) onEvent({ type: "resync" });
+        connected = true;
+        resynced = false;
+        attempt = 0;
+
+        const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+        let buffer = "";
+        for (;;) {
+          const { value, done } = await reader.read();
+          if (done) break;
+          buffer += value;
+          const frames = buffer.split("\n\n");
+          buffer = frames.pop();
+          for (const frame of frames) {
+            const data = frame
+              .split("\n")
+              .filter((line) => line.startsWith("data: "))
+              .map((line) => line.slice(6))
+              .join("\n");
+            if (!data) continue;
+            const event = JSON.parse(data);
+            resynced = event.type === "resync";
+            onEvent(event);
+          }
+        }
+      } catch (err) {
+        if (signal.aborted) return;
+      }
+      await sleep(Math.min(STREAM_RETRY_MAX_MS, 1000 * 2 ** attempt));
+      attempt += 1;
+    }
+  })();
+  return controller;
+}
@@ -1,5 +1,5 @@
 import React, { useEffect, useMemo, useState } from "react";
-import { getExpenses, createExpense, updateExpense, deleteExpense } from "../api";
+import { getExpenses, createExpense, updateExpense, deleteExpense, openUpdateStream } from "../api";
 import {
     Box,
     Button,
@@ -63,6 +63,12 @@ function toInputDate(value) {
     return `${yyyy}-${mm}-${dd}`;
 }
 
+// Apply a saved row or a stream change to the list, keeping newest-first order
+function upsertExpense(list, expense) {
+    const rest = list.filter((x) => x.id !== expense.id);
+    return [...rest, expense].sort((a, b) => new Date(b.date) - new Date(a.date));
+}
+
 export default function Spending() {
     const [expenses, setExpenses] = useState([]);
     const [loading, setLoading] = useState(true);
@@ -101,6 +107,23 @@ export default function Spending() {
 
     }, []);
 
+    // Changes from this and other tabs/devices arrive as events; refetch only on resync
+    useEffect(() => {
+        if (!token) return undefined;
+        const stream = openUpdateStream(token, (event) => {
+        if (event.type === "resync") {
+            loadExpenses();
+        } else if (event.type === "change" && event.entity === "expense") {
+            if (event.op === "delete") {
+            setExpenses((prev) => prev.filter((x) => x.id !== event.data.id));
+            } else {
+            setExpenses((prev) => upsertExpense(prev, event.data));
+            }
+        }
+        });
+        return () => stream.abort();
+    }, [token]);
+
     const openAddModal = () => {
         setMode("create");
         setEditingId(null);
@@ -135,13 +158,14 @@ export default function Spending() {
         date: toISODate(date),
         };
         try {
+        let saved = null;
         if (mode === "create") {
-            await createExpense(token, payload);
+            saved = await createExpense(token, payload);
         } else if (mode === "edit" && editingId != null) {
-            await updateExpense(token, editingId, payload);
+            saved = await updateExpense(token, editingId, payload);
         }
         closeModal();
-        await loadExpenses();
+        if (saved) setExpenses((prev) => upsertExpense(prev, saved));
         } catch (e) {
         setError(e.message || "Failed to save expense");
         }